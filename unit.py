@@ -9,11 +9,16 @@ Order of basic SI units:
 """
 
 import fractions as fr
-import re
+import functools
+import math
+import numbers
+import operator
 
 import numpy as np
 
 dic = 'TLMIKN'
+_DIC_IDX = {c: i for i, c in enumerate(dic)}
+_ZERO = (0,) * 6
 
 # physical constants
 _c = 299792458  # meters per second, the speed of light in a vacuum
@@ -25,46 +30,89 @@ _g = 6.6743e-11  # gravity constant
 _me = 9.10938356e-31  # kilograms, the mass of an electron
 
 
+def to_fraction(x):
+    """
+    whole exponents become int, others Fraction;
+    floats (e.g. results of matrix inversion) are rounded to the nearest simple fraction
+    """
+    if type(x) is int:
+        return x
+    if isinstance(x, numbers.Integral):  # e.g. numpy integer scalars, which would overflow
+        return int(x)
+    if isinstance(x, float):
+        r = round(x)
+        if abs(x - r) < 1e-9:
+            return r
+        x = fr.Fraction(x).limit_denominator()
+    elif not isinstance(x, fr.Fraction):
+        x = fr.Fraction(x)
+    return x.numerator if x.denominator == 1 else x
+
+
 class Unit:
-    def __init__(self, vec: np.ndarray):
-        self.vec = vec.astype(float)
+    __slots__ = ('vec', '_np')
+
+    def __init__(self, vec):
+        vec = tuple(vec)
+        if type(sum(vec)) is not int:  # only all-int vectors sum to an int
+            vec = tuple(map(to_fraction, vec))
+        self.vec = vec
+        self._np = None
+
+    @property
+    def np(self):
+        if self._np is None:
+            self._np = np.fromiter(self.vec, dtype=float, count=6)
+            self._np.setflags(write=False)  # shared by every holder of this (possibly cached) unit
+        return self._np
+
+    def __eq__(self, o):
+        return isinstance(o, Unit) and self.vec == o.vec
+
+    def __hash__(self):
+        return hash(self.vec)
 
     def __mul__(self, o: 'Unit'):
-        return Unit(self.vec + o.vec)
+        return Unit(tuple(map(operator.add, self.vec, o.vec)))
 
     def __truediv__(self, o: 'Unit'):
-        return Unit(self.vec - o.vec)
-
-    def __pow__(self, power: int):
-        return Unit(self.vec * int(power))
+        return Unit(tuple(map(operator.sub, self.vec, o.vec)))
+
+    def __pow__(self, power):
+        if power == 1:
+            return Unit(self.vec)
+        if power == 0:
+            return Unit(_ZERO)
+        if power == -1:
+            return Unit(tuple(-a for a in self.vec))
+        if not isinstance(power, int):
+            power = to_fraction(power)
+        return Unit(tuple(a * power for a in self.vec))
+
+    def _format(self, names):
+        return ' '.join('[' + names[i] + ']' + str(v) for i, v in enumerate(self.vec) if v)
 
     def __repr__(self):
-        res = []
-        for i in range(6):
-            if fr.Fraction(self.vec[i]).limit_denominator() == 0: continue
-            s = '[' + dic[i] + ']' + str(fr.Fraction(self.vec[i]).limit_denominator())
-            res.append(s)
-        return ' '.join(res)
+        return self._format(dic)
 
 
 def unit_from_str(string: str):
-    u = Unit(np.zeros((6,)))
+    vec = [0] * 6
     arr = string.split(' ')
     for a in arr:
-        letter = re.findall(r'\[([A-Z])\]', a)
-        integer = a[3:]
-        if letter:
-            u.vec[dic.index(letter[0])] = int(integer) if len(integer) else 1
-    return u
+        if len(a) >= 3 and a[0] == '[' and a[2] == ']' and 'A' <= a[1] <= 'Z':
+            if a[1] not in _DIC_IDX: raise ValueError(a)
+            vec[_DIC_IDX[a[1]]] = int(a[3:]) if len(a) > 3 else 1
+    return Unit(vec)
 
 
 def basic_unit(idx: int):
-    u = Unit(np.zeros((6,)))
-    u.vec[idx] = 1
-    return u
+    return Unit(_ZERO[:idx] + (1,) + _ZERO[idx + 1:])
 
 
 class Constant:
+    __slots__ = ('name', 'unit', 'value')
+
     def __init__(self, name, unit, value=1.0):
         self.name = name
         self.unit = unit
@@ -83,6 +131,16 @@ class Constant:
         return self.name + ' = ' + str(self.value) + ' ' + str(self.unit)
 
 
+@functools.lru_cache(maxsize=32)
+def _inv(mat_bytes: bytes, n: int):
+    """
+    inverse of a n*n float matrix, shared (read-only) between unit spaces with identical matrices
+    """
+    U = np.linalg.inv(np.frombuffer(mat_bytes).reshape(n, n))
+    U.setflags(write=False)
+    return U
+
+
 """
 example:
 
@@ -93,8 +151,12 @@ example:
 
 
 class UnitSpace:
+    __slots__ = ('mat', 'U', 'dic', 'ccs', '_log_ccs', '_cache', '_factor_cache')
+
     def __init__(self, constants: list[Constant]):
-        mat = np.vstack(list(map(lambda x: x.unit.vec, constants)))
+        mat = np.empty((len(constants), 6))
+        for i, c in enumerate(constants):
+            mat[i] = c.unit.np
         m, n = mat.shape
         if m == n:
             self.mat = mat
@@ -108,19 +170,33 @@ class UnitSpace:
                 if not omitted[i]:
                     self.mat[i, :] = mat[cnt, :]
                     cnt += 1
-        self.U = np.linalg.inv(self.mat)
-        self.dic = list(map(lambda x: x.name, constants))
-        self.ccs = np.array(list(map(lambda x: x.value, constants)))  # means "convert constants"
+        self.U = _inv(self.mat.tobytes(), self.mat.shape[0])
+        self.dic = [c.name for c in constants]
+        self.ccs = np.fromiter((c.value for c in constants), dtype=float, count=len(constants))  # means "convert constants"
+        # log of convert constants, None if any of them can not be taken log of
+        self._log_ccs = np.log(self.ccs) if np.all(self.ccs > 0) else None
+        self._cache = functools.lru_cache(maxsize=256)(self._convert_impl)
+        self._factor_cache = functools.lru_cache(maxsize=256)(self._factor_impl)
 
     def __eq__(self, other):
         return (self.mat == other.mat).all()
 
+    def _convert_impl(self, vec: tuple):
+        return IUnit(np.fromiter(vec, dtype=float, count=6) @ self.U, self)
+
     def unit_convert(self, u: Unit):
-        return IUnit(u.vec @ self.U, self)
+        return self._cache(u.vec)
 
-    def value_convert(self, co: Constant):
+    def value_convert(self, co: Constant, fast=False):
+        """
+        fast: use exp(vec @ log(ccs)) instead of prod(ccs ** vec), cheaper but only accurate to about
+        1e-14 relative (up to 1e-13 for large exponents), since the error grows with |vec @ log(ccs)|
+        """
         new_unit = self.unit_convert(co.unit)
-        convert_constant = np.prod(self.ccs ** new_unit.vec)
+        if fast and self._log_ccs is not None:
+            convert_constant = math.exp(float(new_unit.np @ self._log_ccs))
+        else:
+            convert_constant = np.prod(self.ccs ** new_unit.np)
         new_val = co.value / convert_constant
         return Constant(co.name, new_unit, new_val)
 
@@ -136,43 +212,50 @@ class UnitSpace:
         factor = target / origin
         return self.unit_convert(factor)
 
+    def _factor_impl(self, target_vec: tuple, origin_vec: tuple):
+        return self.factor(Unit(target_vec) / Unit(origin_vec)).value
+
     def value_to(self, origin: Constant, target: Unit):
-        factor_unit = target / origin.unit
-        factor = self.factor(factor_unit)
-        return origin * factor
+        return Constant('', target, origin.value * self._factor_cache(target.vec, origin.unit.vec))
 
 
 class IUnit(Unit):
-    def __init__(self, vec: np.ndarray, base: UnitSpace):
+    __slots__ = ('base',)
+
+    def __init__(self, vec, base: UnitSpace):
         super(IUnit, self).__init__(vec)
         self.base = base
 
+    def __eq__(self, o):
+        return isinstance(o, IUnit) and self.vec == o.vec and self.base is o.base
+
+    def __hash__(self):
+        return hash((self.vec, id(self.base)))
+
+    def same_space(self, o: 'IUnit'):
+        return self.base == o.base
+
     def si(self):
-        return Unit(self.vec @ self.base.mat)
+        return Unit(self.np @ self.base.mat)
 
     def __mul__(self, o: 'IUnit'):
-        if self.base != o.base:
+        if self.base is not o.base:
             raise ValueError
-        return IUnit(self.vec + o.vec, self.base)
+        return IUnit(tuple(map(operator.add, self.vec, o.vec)), self.base)
 
     def __rmul__(self, o: Unit):
         return o * self.si()
 
     def __truediv__(self, o: 'IUnit'):
-        if self.base != o.base:
+        if self.base is not o.base:
             raise ValueError
-        return IUnit(self.vec - o.vec, self.base)
+        return IUnit(tuple(map(operator.sub, self.vec, o.vec)), self.base)
 
     def __rdiv__(self, o: Unit):
         return o / self.si()
 
     def __repr__(self):
-        res = []
-        for i in range(6):
-            if fr.Fraction(self.vec[i]).limit_denominator() == 0: continue
-            s = '[' + self.base.dic[i] + ']' + str(fr.Fraction(self.vec[i]).limit_denominator())
-            res.append(s)
-        return ' '.join(res)
+        return self._format(self.base.dic)
 
 
 # basic units
@@ -230,6 +313,19 @@ PlanckUnit = UnitSpace([c_, hbar_, G_, e_, kB_, nA_])
 NaturalM = UnitSpace([Constant('M', M, 1), c_, hbar_, e_, kB_, nA_])
 NaturalL = UnitSpace([Constant('L', L, 1), c_, hbar_, e_, kB_, nA_])
 
+# conversion factors of energy, all taken by the exact prod(ccs ** vec) path
+_K_UNIT = NaturalL.unit_convert(Hamilton)
+# taken as value_convert's own prod rather than through value_convert / factor,
+# so that k = si / _J_PER_K_UNIT stays bit-identical to value_convert(si)
+_J_PER_K_UNIT = np.prod(NaturalL.ccs ** _K_UNIT.np)  # Joules per natural unit of k
+_HZ_PER_J = NaturalM.value_to(origin=Constant('', Hamilton), target=Frequency).value
+_KG_PER_J = NaturalM.value_to(origin=Constant('', Hamilton), target=M).value
+
+# and Joules per unit of them, through the exact (memoized) value_to
+_J_PER_K = NaturalL.value_to(origin=Constant('', L ** -1), target=Hamilton).value
+_J_PER_HZ = NaturalM.value_to(origin=Constant('', Frequency), target=Hamilton).value
+_J_PER_KG = NaturalM.value_to(origin=Constant('', M), target=Hamilton).value
+
 
 class Energy:
     def __init__(self, si: float):
@@ -239,16 +335,16 @@ class Energy:
         return self.si.value / _e
 
     def k(self):
-        return NaturalL.value_convert(self.si)
+        return Constant(self.si.name, _K_UNIT, self.si.value / _J_PER_K_UNIT)
 
     def wavelength(self):
         return 1 / self.k().value
 
     def freq(self):
-        return NaturalM.value_to(origin=self.si, target=Frequency)
+        return Constant('', Frequency, self.si.value * _HZ_PER_J)
 
     def mass(self):
-        return NaturalM.value_to(origin=self.si, target=M)
+        return Constant('', M, self.si.value * _KG_PER_J)
 
 
 def energy_from_ev(ev: float):
@@ -256,21 +352,15 @@ def energy_from_ev(ev: float):
 
 
 def energy_from_wavelength(lamda: float):
-    lamda = Constant('', L ** -1, 1 / lamda)
-    joule = NaturalL.value_to(origin=lamda, target=Hamilton).value
-    return Energy(joule)
+    return Energy(1 / lamda * _J_PER_K)
 
 
 def energy_from_freq(freq: float):
-    freq = Constant('', Frequency, freq)
-    joule = NaturalM.value_to(origin=freq, target=Hamilton).value
-    return Energy(joule)
+    return Energy(freq * _J_PER_HZ)
 
 
 def energy_from_mass(mass: float):
-    mass = Constant('', M, mass)
-    joule = NaturalM.value_to(origin=mass, target=Hamilton).value
-    return Energy(joule)
+    return Energy(mass * _J_PER_KG)
 
 
 if __name__ == '__main__':